@@ -3,10 +3,9 @@ import streamlit as st
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
-import time
 import pytz
-from indicators import generate_signal
-from telegram_sender import send_telegram_signal_sync, send_test_telegram
+from indicators import STRATEGIES, evaluate_strategies
+from telegram_sender import send_telegram_signal_sync, send_telegram_digest_sync, send_test_telegram
 
 # Page configuration
 st.set_page_config(page_title="2X Clean Execution Scanner", layout="wide")
@@ -31,9 +30,16 @@ with st.sidebar:
     # Timeframe selection
     timeframe = st.selectbox("Timeframe", ["5m", "15m", "1h", "1d"], key="timeframe", index=1)
     
-    # EMA parameter (single EMA, not two)
+    # Strategies evaluated together in one pass per symbol
+    strategies = st.multiselect("Strategies", list(STRATEGIES), default=["ema_supertrend"], key="strategies")
+    
+    # EMA parameter for ema_supertrend (single EMA)
     ema_length = st.number_input("EMA Length", value=30, min_value=1, key="ema_length")
     
+    # Fast/slow EMA parameters for ema_crossover
+    ema_fast = st.number_input("Fast EMA", value=9, min_value=1, key="ema_fast")
+    ema_slow = st.number_input("Slow EMA", value=21, min_value=1, key="ema_slow")
+    
     # Supertrend parameters
     supertrend_atr_length = st.number_input("Supertrend ATR Length", value=10, min_value=1, key="st_atr")
     supertrend_multiplier = st.number_input("Supertrend Multiplier", value=2.0, min_value=0.1, step=0.1, key="st_mult")
@@ -49,6 +55,7 @@ with st.sidebar:
 st.markdown("---")
 st.subheader("Telegram Notifications")
 telegram_chat_id = st.text_input("Telegram Chat ID", placeholder="Your chat ID")
+telegram_digest = st.checkbox("Send new signals as one Telegram digest per scan", key="telegram_digest")
 
 if st.button("Send Test Signal", key="test_telegram"):
     if telegram_chat_id:
@@ -62,121 +69,265 @@ if st.button("Send Test Signal", key="test_telegram"):
         st.warning("Please enter your Telegram Chat ID first")
 
 # Display market status
-# Get current time in IST
-ist_tz = pytz.timezone('Asia/Kolkata')
-current_time_ist = datetime.now(ist_tz).time()
-market_open_time = datetime.strptime("09:15", "%H:%M").time()
-market_close_time = datetime.strptime("15:30", "%H:%M").time()
-is_market_open = market_open_time <= current_time_ist <= market_close_time
+def market_is_open():
+    """Check the current IST time against market hours (9:15 AM - 3:30 PM)"""
+    ist_tz = pytz.timezone('Asia/Kolkata')
+    current_time_ist = datetime.now(ist_tz).time()
+    market_open_time = datetime.strptime("09:15", "%H:%M").time()
+    market_close_time = datetime.strptime("15:30", "%H:%M").time()
+    return market_open_time <= current_time_ist <= market_close_time
+
+is_market_open = market_is_open()
 
 if is_market_open:
     st.success("✓ MARKET OPEN (9:15 AM - 3:30 PM IST)")
 else:
     st.warning("✗ MARKET CLOSED - Last data may be outdated")
 
-# Scan button
-col1, col2 = st.columns([1, 3])
-with col1:
-    scan_button = st.button("🔍 Scan for Signals", key="scan_btn")
+# Download window per timeframe: (period, interval)
+TIMEFRAME_PERIODS = {
+    "5m": ("10d", "5m"),
+    "15m": ("10d", "15m"),
+    "1h": ("30d", "1h"),
+    "1d": ("1y", "1d"),
+}
 
-# Auto-refresh every 5 minutes
-st.markdown("<div style='color: #888; font-size: 12px;'>Auto-refreshing every 5 minutes...</div>", unsafe_allow_html=True)
+# Auto-refresh interval for the results section
+REFRESH_INTERVAL = "5m"
 
-if scan_button or st.session_state.get('auto_scan', False):
-    st.session_state.auto_scan = True
-    
-    # Get stocks to scan
-    symbols = stock_lists[stock_list_name].split(",")
-    
+RESULT_COLUMNS = ["Signal", "Price", "EMA", "Supertrend", "ATR", "SL", "TP", "R:R", "Time"]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def download_bars(symbol, timeframe):
+    """
+    Download OHLC bars for a symbol, shared across all sessions for a minute
+    so concurrent viewers don't each hit Yahoo Finance.
+    """
+    period, interval = TIMEFRAME_PERIODS[timeframe]
+    return yf.download(symbol, period=period, interval=interval, progress=False)
+
+
+@st.cache_data(max_entries=5000, show_spinner=False)
+def evaluate_symbol(symbol, last_bar, strategies, params, _data):
+    """
+    Run the selected strategies on a symbol's bars and return a numeric
+    result row per strategy that has a signal.
+
+    Cached on (symbol, last_bar, strategies, params): `last_bar` is the
+    timestamp and close of the latest candle, so indicators are only
+    recomputed for symbols whose data actually moved since the previous scan.
+    """
+    sl_multiplier = params["sl_multiplier"]
+    tp_multiplier = params["tp_multiplier"]
+    current_price = float(last_bar[1])
+    rows = {}
+
+    signals = evaluate_strategies(_data, strategies, **params)
+
+    for strategy, (signal, atr, ema, supertrend_val, st_direction) in signals.items():
+        if signal == "NONE":
+            continue
+
+        # Calculate SL and TP
+        if signal == "BUY":
+            sl_price = current_price - (atr * sl_multiplier)
+            tp_price = current_price + (atr * tp_multiplier)
+            rr_ratio = (tp_price - current_price) / (current_price - sl_price) if current_price != sl_price else 0
+        else:  # SELL
+            sl_price = current_price + (atr * sl_multiplier)
+            tp_price = current_price - (atr * tp_multiplier)
+            rr_ratio = (current_price - tp_price) / (sl_price - current_price) if sl_price != current_price else 0
+
+        rows[strategy] = {
+            "Signal": signal,
+            "Price": current_price,
+            "EMA": float(ema),
+            "Supertrend": float(supertrend_val),
+            "ATR": float(atr),
+            "SL": float(sl_price),
+            "TP": float(tp_price),
+            "R:R": float(rr_ratio),
+        }
+
+    return rows
+
+
+def merge_results(previous, latest):
+    """
+    Merge a fresh scan into the previous results table.
+
+    Rows whose values did not change keep their original "Time", so the
+    table only reflects symbols whose signal or levels moved.
+    """
+    if previous is None or previous.empty or latest.empty:
+        return latest
+
+    common = latest.index.intersection(previous.index)
+    value_columns = [col for col in RESULT_COLUMNS if col != "Time"]
+    unchanged = common[(latest.loc[common, value_columns] == previous.loc[common, value_columns]).all(axis=1)]
+
+    merged = latest.copy()
+    merged.loc[unchanged, "Time"] = previous.loc[unchanged, "Time"]
+    return merged
+
+
+def new_signals(previous, latest):
+    """
+    Rows of the latest scan whose (Symbol, Strategy) is new or whose Signal
+    flipped. Moving prices alone don't count, so standing signals are not
+    re-sent on every scan.
+    """
+    if previous is None or previous.empty:
+        return latest
+
+    previous_signal = previous["Signal"].reindex(latest.index)
+    return latest[previous_signal.isna() | (previous_signal != latest["Signal"])]
+
+
+def color_signal(val):
+    """Color code by signal"""
+    if val == "BUY":
+        return "background-color: #0d7d0d; color: white;"
+    elif val == "SELL":
+        return "background-color: #8b0000; color: white;"
+    return ""
+
+
+def scan_universe(symbols, timeframe, strategies, params):
+    """Scan every symbol and return the signals as a numeric DataFrame indexed by (symbol, strategy)"""
     progress_bar = st.progress(0)
     status_text = st.empty()
-    results_data = []
-    
+    results_data = {}
+    scan_time = datetime.now().strftime("%H:%M:%S")
+
     for idx, symbol in enumerate(symbols):
         progress_bar.progress((idx + 1) / len(symbols))
         status_text.text(f"Scanning {idx + 1}/{len(symbols)}: {symbol}")
-        
+
         try:
-            # Download data based on timeframe
-            if timeframe == "5m":
-                data = yf.download(symbol, period="10d", interval="5m", progress=False)
-            elif timeframe == "15m":
-                data = yf.download(symbol, period="10d", interval="15m", progress=False)
-            elif timeframe == "1h":
-                data = yf.download(symbol, period="30d", interval="1h", progress=False)
-            else:  # 1d
-                data = yf.download(symbol, period="1y", progress=False)
-            
-            if len(data) > max(ema_length, supertrend_atr_length, atr_length):
-                # Generate signal using the new logic with your exact parameters
-                signal, atr, ema, supertrend_val, st_direction = generate_signal(
-                    data,
-                    ema_length=ema_length,
-                    supertrend_atr_length=supertrend_atr_length,
-                    supertrend_multiplier=supertrend_multiplier,
-                    atr_length=atr_length,
-                    sl_multiplier=sl_multiplier,
-                    tp_multiplier=tp_multiplier
-                )
-                
-                if signal != "NONE":
-                    current_price = data['Close'].iloc[-1]
-                    
-                    # Calculate SL and TP
-                    if signal == "BUY":
-                        sl_price = current_price - (atr * sl_multiplier)
-                        tp_price = current_price + (atr * tp_multiplier)
-                        rr_ratio = (tp_price - current_price) / (current_price - sl_price) if current_price != sl_price else 0
-                    else:  # SELL
-                        sl_price = current_price + (atr * sl_multiplier)
-                        tp_price = current_price - (atr * tp_multiplier)
-                        rr_ratio = (current_price - tp_price) / (sl_price - current_price) if sl_price != current_price else 0
-                    
-                    results_data.append({
-                        "Symbol": symbol,
-                        "Signal": signal,
-                        "Price": f"₹{current_price:.2f}",
-                        "EMA(30)": f"₹{ema:.2f}",
-                        "Supertrend": f"₹{supertrend_val:.2f}",
-                        "ATR": f"₹{atr:.2f}",
-                        "SL": f"₹{sl_price:.2f}",
-                        "TP": f"₹{tp_price:.2f}",
-                        "R:R": f"{rr_ratio:.2f}",
-                        "Time": datetime.now().strftime("%H:%M:%S")
-                    })
-        
+            data = download_bars(symbol, timeframe)
+            if data.empty:
+                continue
+
+            last_bar = (data.index[-1], float(data['Close'].iloc[-1]))
+            rows = evaluate_symbol(symbol, last_bar, strategies, params, data)
+            for strategy, row in rows.items():
+                results_data[(symbol, strategy)] = {**row, "Time": scan_time}
+
         except Exception as e:
             status_text.text(f"Error scanning {symbol}: {str(e)}")
             pass
-    
+
     progress_bar.empty()
     status_text.empty()
-    
+
+    index = pd.MultiIndex.from_tuples(list(results_data), names=["Symbol", "Strategy"])
+    return pd.DataFrame(list(results_data.values()), index=index, columns=RESULT_COLUMNS)
+
+
+# Scan button
+col1, col2 = st.columns([1, 3])
+with col1:
+    scan_button = st.button("🔍 Scan for Signals", key="scan_btn")
+
+if scan_button:
+    st.session_state.auto_scan = True
+
+# Auto-refresh every 5 minutes
+st.markdown("<div style='color: #888; font-size: 12px;'>Auto-refreshing every 5 minutes...</div>", unsafe_allow_html=True)
+
+
+def scan_results():
+    """Scan the selected universe, merge into the stored results and send the Telegram digest"""
+    # Get stocks to scan
+    symbols = stock_lists[stock_list_name].split(",")
+    params = {
+        "ema_length": ema_length,
+        "ema_fast": ema_fast,
+        "ema_slow": ema_slow,
+        "supertrend_atr_length": supertrend_atr_length,
+        "supertrend_multiplier": supertrend_multiplier,
+        "atr_length": atr_length,
+        "sl_multiplier": sl_multiplier,
+        "tp_multiplier": tp_multiplier,
+    }
+
+    # Start from a clean table whenever the universe or parameters change
+    scan_key = (stock_list_name, timeframe, tuple(strategies), tuple(params.items()))
+    previous = st.session_state.get('results') if st.session_state.get('results_key') == scan_key else None
+
+    latest = scan_universe(symbols, timeframe, tuple(strategies), params)
+    df_results = merge_results(previous, latest)
+    st.session_state.results = df_results
+    st.session_state.results_key = scan_key
+    st.session_state.last_scanned = datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%H:%M:%S')
+
+    changed = new_signals(previous, latest)
+    if telegram_digest and telegram_chat_id and not changed.empty:
+        send_telegram_digest_sync(telegram_chat_id, [
+            {
+                "symbol": symbol,
+                "strategy": strategy,
+                "signal": row["Signal"],
+                "price": row["Price"],
+                "sl": row["SL"],
+                "tp": row["TP"],
+                "rrr_ratio": row["R:R"],
+            }
+            for (symbol, strategy), row in changed.iterrows()
+        ])
+
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def results_section():
+    """
+    Scan and render results. Runs as a fragment so the timed refresh only
+    re-executes this section, not the sidebar and the rest of the page.
+    Timed refreshes only rescan during market hours; a full page run
+    (e.g. the Scan button) always scans.
+    """
+    full_run = st.session_state.pop('full_run', False)
+
+    if not st.session_state.get('auto_scan', False):
+        return
+
+    market_open = market_is_open()
+    if full_run or market_open:
+        scan_results()
+
+    df_results = st.session_state.get('results')
+    if df_results is None:
+        return
+
     # Display results
     st.markdown("---")
-    if results_data:
-        df_results = pd.DataFrame(results_data)
-        
-        # Color code by signal
-        def color_signal(val):
-            if val == "BUY":
-                return "background-color: #0d7d0d; color: white;"
-            elif val == "SELL":
-                return "background-color: #8b0000; color: white;"
-            return ""
-        
-        styled_df = df_results.style.applymap(color_signal, subset=['Signal'])
-        st.dataframe(styled_df, use_container_width=True)
-        
-        st.success(f"✓ Found {len(results_data)} signals")
+    if not df_results.empty:
+        price_format = st.column_config.NumberColumn(format="₹%.2f")
+        st.dataframe(
+            df_results.style.map(color_signal, subset=['Signal']),
+            use_container_width=True,
+            column_config={
+                "Price": price_format,
+                "EMA": price_format,
+                "Supertrend": price_format,
+                "ATR": price_format,
+                "SL": price_format,
+                "TP": price_format,
+                "R:R": st.column_config.NumberColumn(format="%.2f"),
+            }
+        )
+
+        st.success(f"✓ Found {len(df_results)} signals")
     else:
         st.info("No signals found. Try scanning again.")
 
-# Auto-refresh timer
-if is_market_open:
-    st.markdown("---")
-    st.markdown(f"<div style='text-align: center; color: #888;'>Last scanned: {datetime.now().strftime('%H:%M:%S')} IST</div>", unsafe_allow_html=True)
-    
-    # Use streamlit's reruns for auto-refresh
-    time.sleep(300)  # 5 minutes
-    st.rerun()
+    # Auto-refresh timer
+    if market_open:
+        st.markdown("---")
+        st.markdown(f"<div style='text-align: center; color: #888;'>Last scanned: {st.session_state.last_scanned} IST</div>", unsafe_allow_html=True)
+
+
+# Lets the fragment tell a full page run from its own timed refresh
+st.session_state.full_run = True
+results_section()
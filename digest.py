@@ -0,0 +1,132 @@
+# file: digest.py
+import threading
+import time
+from datetime import datetime
+
+# Per-scan alert digests: all signals from a scan go out as one compact
+# message per channel (split only when it exceeds the channel's length limit)
+# instead of one API call per signal.
+
+DIGEST_TITLE = "2X CLEAN EXECUTION DIGEST"
+
+def _to_float(value):
+    """Parse numbers that may arrive pre-formatted, e.g. '₹8,500.00'"""
+    try:
+        return float(str(value).replace('₹', '').replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+def _fmt(value):
+    number = _to_float(value)
+    return f"{number:.2f}" if number is not None else str(value)
+
+def _rr(signal_data):
+    """Risk-reward of a signal; accepts the key names used by the different senders"""
+    for key in ('rrr_ratio', 'rr_ratio', 'rr'):
+        if key in signal_data:
+            return _to_float(signal_data[key]) or 0.0
+    return 0.0
+
+def rank_signals(signals):
+    """
+    Order signals by R:R, best first; ties go to the tighter stop (risk % of entry).
+    With ATR-based SL/TP all signals share one R:R, so the tie-breaker decides.
+    """
+    def risk_pct(signal_data):
+        entry = _to_float(signal_data.get('price', signal_data.get('entry')))
+        sl = _to_float(signal_data.get('sl'))
+        if not entry or sl is None:
+            return float('inf')
+        return abs(entry - sl) / entry
+
+    return sorted(signals, key=lambda s: (-_rr(s), risk_pct(s)))
+
+def format_digest_line(signal_data, include_rr=True):
+    """One compact line per signal"""
+    line = f"{signal_data.get('signal', 'N/A')} {signal_data.get('symbol', 'N/A')} " \
+           f"@ {_fmt(signal_data.get('price', signal_data.get('entry', 'N/A')))} | " \
+           f"SL {_fmt(signal_data.get('sl', 'N/A'))}"
+    if 'tp' in signal_data:
+        line += f" | TP {_fmt(signal_data['tp'])}"
+    if include_rr:
+        line += f" | R:R {_rr(signal_data):.2f}"
+    if signal_data.get('strategy'):
+        line += f" | {signal_data['strategy']}"
+    return line
+
+def build_digest_messages(signals, max_length):
+    """
+    Build the digest for one channel, ranked by R:R and split into as few
+    messages as fit within max_length characters each
+
+    Args:
+        signals: List of signal dictionaries
+        max_length: Channel's message length limit
+
+    Returns:
+        list: Message strings (empty if there are no signals)
+    """
+    if not signals:
+        return []
+
+    header = f"{DIGEST_TITLE} - {len(signals)} signals ({datetime.now().strftime('%H:%M')})"
+
+    # With ATR-based exits every signal shares R:R = TP/SL multiplier; state it
+    # once in the header instead of repeating it on every line
+    rr_values = {round(_rr(s), 2) for s in signals}
+    include_rr = len(rr_values) > 1
+    if not include_rr:
+        header += f" R:R {rr_values.pop():.2f}"
+    # Room for the " [i/n]" part marker added when the digest is split
+    body_limit = max_length - len(header) - len(" [99/99]") - 1
+
+    chunks = []
+    current = []
+    current_length = 0
+    for signal_data in rank_signals(signals):
+        line = format_digest_line(signal_data, include_rr)[:body_limit]
+        if current and current_length + len(line) + 1 > body_limit:
+            chunks.append(current)
+            current = []
+            current_length = 0
+        current.append(line)
+        current_length += len(line) + 1
+    chunks.append(current)
+
+    if len(chunks) == 1:
+        return [header + "\n" + "\n".join(chunks[0])]
+    return [f"{header} [{i}/{len(chunks)}]\n" + "\n".join(chunk) for i, chunk in enumerate(chunks, 1)]
+
+class DigestBuffer:
+    """
+    Collects signals in memory until the flush window has elapsed since the
+    first one arrived, so signals from scans within the window share one
+    digest. A window of 0 flushes on every check.
+    """
+
+    def __init__(self, flush_seconds=0):
+        self.flush_seconds = flush_seconds
+        self._signals = []
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def add(self, signals):
+        with self._lock:
+            if signals and not self._signals:
+                self._opened_at = time.monotonic()
+            self._signals.extend(signals)
+
+    def drain(self):
+        """Return and clear all buffered signals regardless of the window"""
+        with self._lock:
+            signals = self._signals
+            self._signals = []
+            self._opened_at = None
+            return signals
+
+    def drain_if_due(self):
+        """Return and clear the buffered signals once the window has elapsed, else []"""
+        with self._lock:
+            if not self._signals or time.monotonic() - self._opened_at < self.flush_seconds:
+                return []
+        return self.drain()
@@ -3,9 +3,18 @@ import pandas as pd
 import numpy as np
 import pandas_ta as ta
 
-def calculate_supertrend(df, atr_length=10, multiplier=2.0):
+def calculate_atr(df, length=14):
+    """
+    Calculate ATR as Wilder's moving average (RMA) of the true range.
+    Used instead of ta.atr, which switches to TA-Lib's ATR when TA-Lib is
+    installed, so every code path gets the same values.
+    """
+    return ta.rma(ta.true_range(df['High'], df['Low'], df['Close']), length=length)
+
+def calculate_supertrend(df, atr_length=10, multiplier=2.0, atr_val=None):
     """
     Calculate Supertrend indicator
+    Pass `atr_val` to reuse an already computed ATR(atr_length)
     Returns: supertrend values and direction (1 for uptrend, -1 for downtrend)
     """
     high = df['High']
@@ -13,7 +22,8 @@ def calculate_supertrend(df, atr_length=10, multiplier=2.0):
     close = df['Close']
     
     # Calculate ATR
-    atr_val = ta.atr(high, low, close, length=atr_length)
+    if atr_val is None:
+        atr_val = calculate_atr(df, length=atr_length)
     
     # Calculate basic bands
     hl_avg = (high + low) / 2
@@ -40,50 +50,144 @@ def calculate_supertrend(df, atr_length=10, multiplier=2.0):
     
     return supertrend, direction, atr_val
 
-def generate_signal(df, ema_length=30, supertrend_atr_length=10, supertrend_multiplier=2.0, atr_length=14, sl_multiplier=1.5, tp_multiplier=3.0):
+class IndicatorCache:
+    """
+    Memoizes derived series for one symbol's bars so several strategies
+    evaluated on the same data compute TR, ATRs, EMAs and Supertrends once.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._series = {}
+
+    def _get(self, key, compute):
+        if key not in self._series:
+            self._series[key] = compute()
+        return self._series[key]
+
+    def true_range(self):
+        return self._get(("tr",), lambda: ta.true_range(self.df['High'], self.df['Low'], self.df['Close']))
+
+    def atr(self, length):
+        # Same as calculate_atr, reusing the cached true range
+        return self._get(("atr", length), lambda: ta.rma(self.true_range(), length=length))
+
+    def ema(self, length):
+        return self._get(("ema", length), lambda: ta.ema(self.df['Close'], length=length))
+
+    def supertrend(self, atr_length, multiplier):
+        return self._get(
+            ("supertrend", atr_length, multiplier),
+            lambda: calculate_supertrend(self.df, atr_length=atr_length, multiplier=multiplier, atr_val=self.atr(atr_length))
+        )
+
+
+# Strategy registry: name -> function(indicators, **params)
+# Each strategy returns (signal, atr, ema, supertrend, st_direction) like generate_signal
+STRATEGIES = {}
+
+NO_SIGNAL = ("NONE", 0, 0, 0, 0)
+
+def register_strategy(name):
+    """Decorator adding a strategy function to the registry"""
+    def decorator(func):
+        STRATEGIES[name] = func
+        return func
+    return decorator
+
+@register_strategy("ema_supertrend")
+def ema_supertrend_strategy(ind, ema_length=30, supertrend_atr_length=10, supertrend_multiplier=2.0, atr_length=14, **_):
     """
-    Generate trading signals based on:
-    - EMA(30) price position
-    - Supertrend direction (ATR=10, Multiplier=2.0)
-    - ATR(14) for exit levels
-    
-    Entry Rules (from TradingView strategy):
     - LONG: Close > EMA(30) AND Supertrend is BULLISH (uptrend)
     - SHORT: Close < EMA(30) AND Supertrend is BEARISH (downtrend)
-    
-    Exit Rules:
-    - SL: Entry Price ± (ATR(14) × 1.5)
-    - TP: Entry Price ± (ATR(14) × 3.0)
     """
+    if len(ind.df) < max(ema_length, supertrend_atr_length, atr_length) + 5:
+        return NO_SIGNAL
     
-    if len(df) < max(ema_length, supertrend_atr_length, atr_length) + 5:
-        return "NONE", 0, 0, 0, 0
-    
-    # Calculate EMA(30)
-    ema = ta.ema(df['Close'], length=ema_length)
-    
-    # Calculate Supertrend (ATR=10, Multiplier=2.0)
-    supertrend, st_direction, st_atr = calculate_supertrend(df, atr_length=supertrend_atr_length, multiplier=supertrend_multiplier)
-    
-    # Calculate ATR(14) for exit levels
-    atr = ta.atr(df['High'], df['Low'], df['Close'], length=atr_length)
+    ema = ind.ema(ema_length)
+    supertrend, st_direction, _ = ind.supertrend(supertrend_atr_length, supertrend_multiplier)
+    atr = ind.atr(atr_length)
     
     # Get latest values
-    latest_close = df['Close'].iloc[-1]
+    latest_close = ind.df['Close'].iloc[-1]
     latest_ema = ema.iloc[-1]
-    latest_supertrend = supertrend.iloc[-1]
     latest_st_direction = st_direction.iloc[-1]
-    latest_atr = atr.iloc[-1]
     
-    # Determine signal based on entry conditions
     signal = "NONE"
-    
-    # LONG condition: Close > EMA(30) AND Supertrend is BULLISH
     if latest_close > latest_ema and latest_st_direction == 1:
         signal = "BUY"
-    
-    # SHORT condition: Close < EMA(30) AND Supertrend is BEARISH
     elif latest_close < latest_ema and latest_st_direction == -1:
         signal = "SELL"
     
-    return signal, latest_atr, latest_ema, latest_supertrend, latest_st_direction
+    return signal, atr.iloc[-1], latest_ema, supertrend.iloc[-1], latest_st_direction
+
+@register_strategy("ema_crossover")
+def ema_crossover_strategy(ind, ema_fast=9, ema_slow=21, supertrend_atr_length=10, supertrend_multiplier=2.0, atr_length=14, **_):
+    """
+    - LONG: EMA(fast) > EMA(slow) AND Close > EMA(fast) AND Supertrend is BULLISH
+    - SHORT: EMA(fast) < EMA(slow) AND Close < EMA(fast) AND Supertrend is BEARISH
+    Reports EMA(fast) as the EMA value
+    """
+    if len(ind.df) < max(ema_fast, ema_slow, supertrend_atr_length, atr_length) + 5:
+        return NO_SIGNAL
+    
+    fast = ind.ema(ema_fast)
+    slow = ind.ema(ema_slow)
+    supertrend, st_direction, _ = ind.supertrend(supertrend_atr_length, supertrend_multiplier)
+    atr = ind.atr(atr_length)
+    
+    latest_close = ind.df['Close'].iloc[-1]
+    latest_fast = fast.iloc[-1]
+    latest_slow = slow.iloc[-1]
+    latest_st_direction = st_direction.iloc[-1]
+    
+    signal = "NONE"
+    if latest_fast > latest_slow and latest_close > latest_fast and latest_st_direction == 1:
+        signal = "BUY"
+    elif latest_fast < latest_slow and latest_close < latest_fast and latest_st_direction == -1:
+        signal = "SELL"
+    
+    return signal, atr.iloc[-1], latest_fast, supertrend.iloc[-1], latest_st_direction
+
+def evaluate_strategies(df, strategies=None, **params):
+    """
+    Evaluate several registered strategies on the same bars in one pass,
+    sharing derived series between them through an IndicatorCache.
+    
+    Args:
+        df: OHLC DataFrame for one symbol
+        strategies: Strategy names to run (default: all registered)
+        params: Strategy parameters; each strategy picks the ones it uses
+    
+    Returns:
+        dict: strategy name -> (signal, atr, ema, supertrend, st_direction)
+    """
+    if strategies is None:
+        strategies = list(STRATEGIES)
+    
+    ind = IndicatorCache(df)
+    return {name: STRATEGIES[name](ind, **params) for name in strategies}
+
+def generate_signal(df, ema_length=30, supertrend_atr_length=10, supertrend_multiplier=2.0, atr_length=14, sl_multiplier=1.5, tp_multiplier=3.0):
+    """
+    Generate trading signals based on:
+    - EMA(30) price position
+    - Supertrend direction (ATR=10, Multiplier=2.0)
+    - ATR(14) for exit levels
+    
+    Entry Rules (from TradingView strategy):
+    - LONG: Close > EMA(30) AND Supertrend is BULLISH (uptrend)
+    - SHORT: Close < EMA(30) AND Supertrend is BEARISH (downtrend)
+    
+    Exit Rules:
+    - SL: Entry Price ± (ATR(14) × 1.5)
+    - TP: Entry Price ± (ATR(14) × 3.0)
+    """
+    return evaluate_strategies(
+        df,
+        ["ema_supertrend"],
+        ema_length=ema_length,
+        supertrend_atr_length=supertrend_atr_length,
+        supertrend_multiplier=supertrend_multiplier,
+        atr_length=atr_length
+    )["ema_supertrend"]
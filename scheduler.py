@@ -1,6 +1,10 @@
 # file: scheduler.py
 import os
 import json
+import socket
+import sqlite3
+import sys
+import time
 from datetime import datetime
 from pytz import timezone
 import yfinance as yf
@@ -8,7 +12,9 @@ import gspread
 from google.oauth2.service_account import Credentials
 from apscheduler.schedulers.background import BackgroundScheduler
 from twilio.rest import Client
-from indicators import generate_signal
+from indicators import STRATEGIES, evaluate_strategies
+from digest import DigestBuffer, build_digest_messages
+from work_queue import WorkQueue
 
 # Initialize scheduler
 scheduler = BackgroundScheduler()
@@ -19,7 +25,44 @@ TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")  # e.g., "whatsapp:+1234567890"
 USER_WHATSAPP_NUMBER = os.getenv("USER_WHATSAPP_NUMBER")  # e.g., "whatsapp:+1234567890"
 
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+# Created on first use so worker processes, which never alert, need no Twilio credentials
+twilio_client = None
+
+def get_twilio_client():
+    """Return the shared Twilio client, creating it on first use"""
+    global twilio_client
+    if twilio_client is None:
+        twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return twilio_client
+
+# Twilio WhatsApp message body length limit
+WHATSAPP_MAX_LENGTH = 1600
+
+# Digest mode: one WhatsApp message per scan (or flush window) instead of one per signal
+ALERT_DIGEST = os.getenv("ALERT_DIGEST", "false").lower() == "true"
+DIGEST_FLUSH_SECONDS = int(os.getenv("DIGEST_FLUSH_SECONDS", 0))
+digest_buffer = DigestBuffer(DIGEST_FLUSH_SECONDS)
+
+# Strategies evaluated together on each symbol's bars
+STRATEGIES_TO_RUN = [s.strip() for s in os.getenv("STRATEGIES", "ema_supertrend").split(",") if s.strip()]
+STRATEGY_PARAMS = {
+    "ema_fast": int(os.getenv("EMA_FAST", 9)),
+    "ema_slow": int(os.getenv("EMA_SLOW", 21)),
+    "supertrend_atr_length": int(os.getenv("ATR_PERIOD", 10)),
+    "supertrend_multiplier": float(os.getenv("ATR_MULTIPLIER", 2.0)),
+}
+SL_MULTIPLIER = 1.5
+TP_MULTIPLIER = 3.0
+
+SYMBOLS_TO_SCAN = [s.strip() for s in os.getenv("SYMBOLS_TO_SCAN", "^NSEBANK,^NSEI,HDFCBANK.NS,ICICIBANK.NS,BAJAJFINSV.NS").split(",") if s.strip()]
+SCAN_INTERVAL_MINUTES = int(os.getenv("SCAN_INTERVAL_MINUTES", 5))
+
+# Coordinator/worker mode: shards are passed through a local SQLite queue (single host)
+WORK_QUEUE_PATH = os.getenv("WORK_QUEUE_PATH", "scan_queue.db")
+SHARD_SIZE = int(os.getenv("SHARD_SIZE", 25))
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", 120))
+# Alerts older than this are retired as stale instead of sent late (default: one scan interval)
+SIGNAL_MAX_AGE_SECONDS = int(os.getenv("SIGNAL_MAX_AGE_SECONDS", SCAN_INTERVAL_MINUTES * 60))
 
 # Google Sheets Setup
 GOOGLE_SHEETS_CREDENTIALS = os.getenv("GOOGLE_SHEETS_CREDENTIALS_JSON")
@@ -40,11 +83,12 @@ def init_google_sheets():
         print(f"Google Sheets Error: {e}")
         return None
 
-def send_whatsapp_alert(symbol, signal, entry_price, sl, target=None):
-    """Send WhatsApp alert via Twilio"""
+def send_whatsapp_alert(symbol, signal, entry_price, sl, target=None, strategy="ema_supertrend"):
+    """Send WhatsApp alert via Twilio. Returns True if the message was sent"""
     try:
         if signal == "BUY":
             msg = f"\ud83d\udcec *2X CLEAN EXECUTION - BUY SIGNAL*\n\n" \
+                  f"Strategy: {strategy}\n" \
                   f"Symbol: {symbol}\n" \
                   f"Entry: {entry_price:.2f}\n" \
                   f"SL: {sl:.2f}\n" \
@@ -52,24 +96,46 @@ def send_whatsapp_alert(symbol, signal, entry_price, sl, target=None):
                   f"Time: {datetime.now().strftime('%H:%M:%S')}"
         elif signal == "SELL":
             msg = f"\ud83d\udcec *2X CLEAN EXECUTION - SELL SIGNAL*\n\n" \
+                  f"Strategy: {strategy}\n" \
                   f"Symbol: {symbol}\n" \
                   f"Entry: {entry_price:.2f}\n" \
                   f"SL: {sl:.2f}\n" \
                   f"Risk: {abs(entry_price - sl):.2f} pts\n" \
                   f"Time: {datetime.now().strftime('%H:%M:%S')}"
         else:
-            return
+            return False
 
-        twilio_client.messages.create(
+        get_twilio_client().messages.create(
             from_=TWILIO_WHATSAPP_NUMBER,
             to=USER_WHATSAPP_NUMBER,
             body=msg
         )
         print(f"WhatsApp alert sent for {symbol}: {signal}")
+        return True
+    except Exception as e:
+        print(f"WhatsApp Error: {e}")
+        return False
+
+def send_whatsapp_digest(signals):
+    """
+    Send a scan's signals as a WhatsApp digest, split at the message length limit
+    Returns True if every digest message was sent
+    """
+    try:
+        messages = build_digest_messages(signals, WHATSAPP_MAX_LENGTH)
+        for msg in messages:
+            get_twilio_client().messages.create(
+                from_=TWILIO_WHATSAPP_NUMBER,
+                to=USER_WHATSAPP_NUMBER,
+                body=msg
+            )
+        print(f"WhatsApp digest sent: {len(signals)} signals in {len(messages)} message(s)")
+        return True
     except Exception as e:
         print(f"WhatsApp Error: {e}")
+        return False
 
-def log_to_google_sheets(sheet, symbol, signal, entry, sl, risk, timestamp):
+def log_to_google_sheets(sheet, symbol, signal, entry, sl, risk, timestamp, strategy="ema_supertrend"):
     """Log signal to Google Sheets"""
     try:
         if sheet is None:
@@ -84,36 +150,48 @@ def log_to_google_sheets(sheet, symbol, signal, entry, sl, risk, timestamp):
             "PENDING",  # Status: PENDING, FILLED, EXITED
             "",  # Exit Price
             "",  # Exit Time
-            ""  # PnL
+            "",  # PnL
+            strategy
         ])
         print(f"Logged {symbol} {signal} to Google Sheets")
     except Exception as e:
         print(f"Google Sheets Logging Error: {e}")
 
-def scan_symbols():
-    """Scan all symbols for signals every 5 minutes"""
-    symbols_to_scan = [
-        "^NSEBANK",
-        "^NSEI",
-            # Check if current time is within market hours (IST: 9:15 AM - 3:30 PM)
+def validate_strategies():
+    """Fail fast on strategy names in STRATEGIES that are not registered in indicators.py"""
+    unknown = [name for name in STRATEGIES_TO_RUN if name not in STRATEGIES]
+    if unknown:
+        raise ValueError(
+            f"Unknown strategies in STRATEGIES: {', '.join(unknown)}. "
+            f"Available: {', '.join(STRATEGIES)}"
+        )
+
+def is_market_open():
+    """Check if current time is within market hours (IST: 9:15 AM - 3:30 PM)"""
     ist = timezone('Asia/Kolkata')
     now = datetime.now(ist)
     market_open = ist.localize(datetime(now.year, now.month, now.day, 9, 15))
     market_close = ist.localize(datetime(now.year, now.month, now.day, 15, 30))
     
-    # Only scan during market hours
     if not (market_open <= now <= market_close):
         print(f"Market closed. Current time: {now.strftime('%H:%M:%S IST')}. Scanning resumes at 9:15 AM IST")
-        return
-        "HDFCBANK.NS",
-        "ICICIBANK.NS",
-        "BAJAJFINSV.NS",
-    ]
+        return False
+    return True
 
-    sheet = init_google_sheets()
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def scan_shard(symbols, on_symbol_done=None):
+    """
+    Scan a list of symbols and return their signals without alerting
+    
+    Args:
+        symbols: Symbols to scan
+        on_symbol_done: Optional callback after each symbol; returning False stops the scan
+    
+    Returns:
+        list: Dicts with symbol, strategy, signal, entry, sl, tp, rr
+    """
+    results = []
 
-    for symbol in symbols_to_scan:
+    for symbol in symbols:
         try:
             # Fetch 5-min data
             df = yf.download(symbol, period="7d", interval="5m", progress=False)
@@ -121,30 +199,209 @@ def scan_symbols():
                 continue
 
             df = df.dropna()
-            signal, sl = generate_signal(df)
+            last_close = float(df["Close"].iloc[-1])
+
+            # One pass over the bars for all strategies
+            signals = evaluate_strategies(df, STRATEGIES_TO_RUN, **STRATEGY_PARAMS)
 
-            if signal != "NONE":
-                last_close = df["Close"].iloc[-1]
-                risk = abs(last_close - sl)
+            for strategy, (signal, atr, ema, supertrend_val, st_direction) in signals.items():
+                if signal == "NONE":
+                    continue
 
-                # Send WhatsApp alert
-                send_whatsapp_alert(symbol, signal, last_close, sl)
+                if signal == "BUY":
+                    sl = last_close - atr * SL_MULTIPLIER
+                    tp = last_close + atr * TP_MULTIPLIER
+                else:  # SELL
+                    sl = last_close + atr * SL_MULTIPLIER
+                    tp = last_close - atr * TP_MULTIPLIER
+                rr = abs(tp - last_close) / abs(last_close - sl) if last_close != sl else 0
 
-                # Log to Google Sheets
-                log_to_google_sheets(sheet, symbol, signal, last_close, sl, risk, timestamp)
+                results.append({
+                    "symbol": symbol,
+                    "strategy": strategy,
+                    "signal": signal,
+                    "entry": last_close,
+                    "sl": float(sl),
+                    "tp": float(tp),
+                    "rr": float(rr),
+                })
 
         except Exception as e:
             print(f"Error scanning {symbol}: {e}")
 
+        if on_symbol_done is not None and on_symbol_done() is False:
+            break
+
+    return results
+
+def log_signals(signals):
+    """Log delivered signals to Google Sheets"""
+    if not signals:
+        return
+
+    sheet = init_google_sheets()
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    for s in signals:
+        risk = abs(s["entry"] - s["sl"])
+        log_to_google_sheets(sheet, s["symbol"], s["signal"], s["entry"], s["sl"], risk, timestamp, strategy=s["strategy"])
+
+def dispatch_signals(signals):
+    """
+    Send one WhatsApp alert per signal and log the delivered ones to Google Sheets
+    
+    Returns:
+        list: The signals whose alert was delivered
+    """
+    delivered = [
+        s for s in signals
+        if send_whatsapp_alert(s["symbol"], s["signal"], s["entry"], s["sl"], strategy=s["strategy"])
+    ]
+    log_signals(delivered)
+    return delivered
+
+def flush_digest(force=False):
+    """
+    Send the buffered signals as one WhatsApp digest once the flush window
+    has elapsed (or right away with force). Runs as its own job so the
+    buffer drains whatever the market state; a failed send is re-buffered.
+    """
+    signals = digest_buffer.drain() if force else digest_buffer.drain_if_due()
+    if not signals:
+        return
+
+    if send_whatsapp_digest(signals):
+        log_signals(signals)
+    else:
+        digest_buffer.add(signals)
+
+def scan_symbols():
+    """Scan all symbols for signals every SCAN_INTERVAL_MINUTES"""
+    # Only scan during market hours
+    if not is_market_open():
+        return
+
+    signals = scan_shard(SYMBOLS_TO_SCAN)
+    if ALERT_DIGEST:
+        digest_buffer.add(signals)
+        flush_digest()
+    else:
+        dispatch_signals(signals)
+
+def current_tick():
+    """Identify the scan interval the current time falls in, e.g. 2024-01-15T10:05"""
+    now = datetime.now(timezone('Asia/Kolkata'))
+    # Bucket minutes since midnight so intervals that don't divide 60 stay aligned
+    minutes = now.hour * 60 + now.minute
+    minutes -= minutes % SCAN_INTERVAL_MINUTES
+    return now.replace(hour=minutes // 60, minute=minutes % 60).strftime("%Y-%m-%dT%H:%M")
+
+def enqueue_scan(queue):
+    """Coordinator job: shard the universe onto the queue for this tick"""
+    if not is_market_open():
+        return
+
+    tick = current_tick()
+    # Shards not claimed before the next enqueue are expired rather than scanned late
+    queued = queue.enqueue_tick(tick, SYMBOLS_TO_SCAN, SHARD_SIZE, SCAN_INTERVAL_MINUTES * 60)
+    print(f"Queued {queued} shards for tick {tick}")
+
+def dispatch_queued_signals(queue):
+    """Coordinator job: alert on signals pushed back by workers, confirming each one only once delivered"""
+    for s in queue.reap_undelivered_signals(SIGNAL_MAX_AGE_SECONDS):
+        print(f"Dropping {s['status']} alert for tick {s['tick']}: {s['symbol']} {s['signal']} ({s['strategy']})")
+
+    if ALERT_DIGEST:
+        # The queue itself holds signals through the flush window, so nothing
+        # is marked sent until the digest carrying it went out
+        signals = queue.claim_pending_signals(LEASE_SECONDS, min_age=DIGEST_FLUSH_SECONDS)
+        if signals and send_whatsapp_digest(signals):
+            queue.mark_signals_sent(signals)
+            log_signals(signals)
+        else:
+            queue.release_signals(signals)
+    else:
+        signals = queue.claim_pending_signals(LEASE_SECONDS)
+        delivered = dispatch_signals(signals)
+        queue.mark_signals_sent(delivered)
+        queue.release_signals([s for s in signals if s not in delivered])
+
+    for shard_id, tick, symbols, worker, status in queue.reap_shards():
+        if status == "expired":
+            print(f"Shard {shard_id} for tick {tick} expired before it was scanned (last worker: {worker}): {symbols}")
+        else:
+            print(f"Shard {shard_id} for tick {tick} failed on every attempt (last worker: {worker}): {symbols}")
+
+def start_coordinator():
+    """Start the coordinator: enqueue shards every interval and dispatch worker results"""
+    queue = WorkQueue(WORK_QUEUE_PATH)
+    scheduler.add_job(enqueue_scan, "interval", minutes=SCAN_INTERVAL_MINUTES, args=[queue], id="enqueue_job", next_run_time=datetime.now())
+    scheduler.add_job(dispatch_queued_signals, "interval", seconds=10, args=[queue], id="dispatch_job")
+    if not scheduler.running:
+        scheduler.start()
+    print(f"Coordinator started: {len(SYMBOLS_TO_SCAN)} symbols in shards of {SHARD_SIZE} every {SCAN_INTERVAL_MINUTES} minutes")
+
+def run_worker(worker_id=None, poll_seconds=2):
+    """Claim shards from the queue, scan them and push the signals back"""
+    validate_strategies()
+    queue = WorkQueue(WORK_QUEUE_PATH)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    print(f"Worker {worker_id} started")
+
+    backoff = poll_seconds
+    while True:
+        try:
+            claimed = queue.claim_shard(worker_id, LEASE_SECONDS)
+            if claimed is None:
+                time.sleep(poll_seconds)
+                continue
+
+            shard_id, tick, symbols = claimed
+            signals = scan_shard(symbols, on_symbol_done=lambda: queue.extend_lease(shard_id, worker_id, LEASE_SECONDS))
+
+            if queue.complete_shard(shard_id, worker_id, tick, signals):
+                print(f"Worker {worker_id} completed shard {shard_id} ({len(symbols)} symbols, {len(signals)} signals)")
+            else:
+                print(f"Worker {worker_id} lost the lease on shard {shard_id}, discarding results")
+            backoff = poll_seconds
+
+        except sqlite3.OperationalError as e:
+            # e.g. "database is locked": the shard's lease will expire and it gets re-leased
+            print(f"Worker {worker_id} queue error: {e}. Retrying in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
 def start_scheduler():
     """Start the background scheduler"""
-    scheduler.add_job(scan_symbols, "interval", minutes=5, id="scan_job")
+    validate_strategies()
+    scheduler.add_job(scan_symbols, "interval", minutes=SCAN_INTERVAL_MINUTES, id="scan_job")
+    if ALERT_DIGEST:
+        scheduler.add_job(flush_digest, "interval", seconds=10, id="digest_job")
     if not scheduler.running:
         scheduler.start()
-    print("Scheduler started: Scanning every 5 minutes")
+    print(f"Scheduler started: Scanning every {SCAN_INTERVAL_MINUTES} minutes")
 
 def stop_scheduler():
     """Stop the background scheduler"""
     if scheduler.running:
         scheduler.shutdown()
+    # Don't leave buffered digest signals behind in memory
+    flush_digest(force=True)
     print("Scheduler stopped")
+
+if __name__ == "__main__":
+    # Usage: python scheduler.py [standalone|coordinator|worker]
+    mode = sys.argv[1] if len(sys.argv) > 1 else "standalone"
+
+    if mode == "worker":
+        run_worker()
+    else:
+        if mode == "coordinator":
+            start_coordinator()
+        else:
+            start_scheduler()
+        try:
+            while True:
+                time.sleep(1)
+        except (KeyboardInterrupt, SystemExit):
+            stop_scheduler()
@@ -1,12 +1,16 @@
 # file: sms_sender.py
 import os
 from twilio.rest import Client
+from digest import build_digest_messages
 
 # Load Twilio credentials from environment variables
 ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
 
+# Twilio message body length limit
+SMS_MAX_LENGTH = 1600
+
 def send_sms_signal(to_number: str, signal_data: dict) -> bool:
     """
     Send trading signals via SMS using Twilio
@@ -96,4 +100,41 @@ def send_test_sms(to_number: str) -> bool:
         'time': '14:30'
     }
     
-    return send_sms_signal(to_number, test_signal)
\ No newline at end of file
+    return send_sms_signal(to_number, test_signal)
+
+def send_sms_digest(to_number: str, signals: list) -> bool:
+    """
+    Send all signals from a scan as one SMS digest, split only at
+    Twilio's message body length limit
+    
+    Args:
+        to_number: Recipient's phone number
+        signals: List of signal dictionaries
+    
+    Returns:
+        bool: True if every digest message was sent
+    """
+    try:
+        if not ACCOUNT_SID or not AUTH_TOKEN or not TWILIO_PHONE_NUMBER:
+            print("Error: Twilio credentials not configured.")
+            return False
+        
+        client = Client(ACCOUNT_SID, AUTH_TOKEN)
+        
+        if not to_number.startswith('+'):
+            to_number = f'+{to_number}'
+        
+        messages = build_digest_messages(signals, SMS_MAX_LENGTH)
+        for message_text in messages:
+            client.messages.create(
+                from_=TWILIO_PHONE_NUMBER,
+                body=message_text,
+                to=to_number
+            )
+        
+        print(f"SMS digest of {len(signals)} signals sent in {len(messages)} message(s)")
+        return True
+    
+    except Exception as e:
+        print(f"Error sending SMS digest: {str(e)}")
+        return False
@@ -3,11 +3,15 @@ import os
 import asyncio
 from telegram import Bot
 from telegram.error import TelegramError
+from digest import build_digest_messages
 
 # Load Telegram credentials from environment variables
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
+# Telegram Bot API message length limit
+TELEGRAM_MAX_LENGTH = 4096
+
 async def send_telegram_signal(chat_id: str, signal_data: dict) -> bool:
     """
     Send trading signals via Telegram using Telegram Bot API
@@ -99,4 +103,50 @@ def send_test_telegram(chat_id: str) -> bool:
         'time': '14:30'
     }
     
-    return send_telegram_signal_sync(chat_id, test_signal)
\ No newline at end of file
+    return send_telegram_signal_sync(chat_id, test_signal)
+
+async def send_telegram_digest(chat_id: str, signals: list) -> bool:
+    """
+    Send all signals from a scan as one digest message, split only at
+    Telegram's message length limit
+    
+    Args:
+        chat_id: Telegram chat ID or user ID
+        signals: List of signal dictionaries
+    
+    Returns:
+        bool: True if every digest message was sent
+    """
+    try:
+        if not TELEGRAM_BOT_TOKEN:
+            print("Error: Telegram bot token not configured.")
+            return False
+        
+        bot = Bot(token=TELEGRAM_BOT_TOKEN)
+        
+        messages = build_digest_messages(signals, TELEGRAM_MAX_LENGTH)
+        for message_text in messages:
+            await bot.send_message(chat_id=chat_id, text=message_text)
+        print(f"Telegram digest of {len(signals)} signals sent to {chat_id} in {len(messages)} message(s)")
+        return True
+    
+    except TelegramError as e:
+        print(f"Telegram error: {str(e)}")
+        return False
+    except Exception as e:
+        print(f"Error sending Telegram digest: {str(e)}")
+        return False
+
+def send_telegram_digest_sync(chat_id: str, signals: list) -> bool:
+    """
+    Synchronous wrapper for sending a Telegram digest
+    """
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        result = loop.run_until_complete(send_telegram_digest(chat_id, signals))
+        loop.close()
+        return result
+    except Exception as e:
+        print(f"Error in sync wrapper: {str(e)}")
+        return False
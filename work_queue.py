@@ -0,0 +1,318 @@
+# file: work_queue.py
+import json
+import sqlite3
+import time
+
+# SQLite-backed work queue for sharded scanning.
+#
+# The coordinator splits each scan tick's symbol list into shards. Workers
+# lease a shard, scan it, and push the signals back. A lease that is not
+# completed before it expires (worker crashed or hung) is handed to the next
+# worker that asks. Shards carry a deadline (normally one scan interval after
+# they were queued); past it they are expired rather than scanned against
+# newer data. Signals are keyed by (tick, symbol, strategy) so a shard
+# scanned twice after a re-lease still produces one alert, and a signal is
+# only marked sent once its alert went out. Alerts that keep failing, or are
+# too old to be actionable, end up 'failed' or 'stale' instead of being sent.
+#
+# SQLite in WAL mode needs shared memory, so the coordinator and all workers
+# must run on one host against a local file (not NFS/SMB). Scale out by
+# running more worker processes on that host.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tick TEXT NOT NULL,
+    shard_index INTEGER NOT NULL,
+    symbols TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    deadline REAL NOT NULL,
+    UNIQUE (tick, shard_index)
+);
+CREATE TABLE IF NOT EXISTS signals (
+    tick TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    signal TEXT NOT NULL,
+    entry REAL NOT NULL,
+    sl REAL NOT NULL,
+    tp REAL NOT NULL,
+    rr REAL NOT NULL,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    claim_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tick, symbol, strategy)
+);
+"""
+
+
+class WorkQueue:
+    """
+    Shard queue stored in a single local SQLite file shared by the
+    coordinator and worker processes on the same host.
+    """
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def enqueue_tick(self, tick, symbols, shard_size, ttl_seconds):
+        """
+        Split symbols into shards for one tick, each to be claimed within
+        ttl_seconds. Calling this again for the same tick is a no-op, so a
+        restarted coordinator does not double-queue.
+
+        Returns:
+            int: Number of shards newly queued
+        """
+        deadline = time.time() + ttl_seconds
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            queued = 0
+            for shard_index, start in enumerate(range(0, len(symbols), shard_size)):
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO shards (tick, shard_index, symbols, deadline) VALUES (?, ?, ?, ?)",
+                    (tick, shard_index, json.dumps(symbols[start:start + shard_size]), deadline)
+                )
+                queued += cursor.rowcount
+            conn.execute("COMMIT")
+            return queued
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim_shard(self, worker, lease_seconds):
+        """
+        Lease the oldest pending shard, or one whose lease has expired.
+        Shards past their deadline are left for reap_shards to expire, so
+        lagging workers never scan an old tick against fresh data.
+
+        Returns:
+            tuple: (shard_id, tick, symbols) or None if there is no work
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, tick, symbols FROM shards "
+                "WHERE attempts < ? AND deadline >= ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                "ORDER BY id LIMIT 1",
+                (self.max_attempts, now, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE shards SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (worker, now + lease_seconds, row[0])
+            )
+            conn.execute("COMMIT")
+            return row[0], row[1], json.loads(row[2])
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def extend_lease(self, shard_id, worker, lease_seconds):
+        """Renew a lease still held by this worker. Returns False if it was lost."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                "UPDATE shards SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + lease_seconds, shard_id, worker)
+            )
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def complete_shard(self, shard_id, worker, tick, signals):
+        """
+        Store a shard's signals and mark it done. Signals already recorded
+        for the tick (from an earlier lease of the same shard) are ignored.
+
+        Args:
+            signals: List of dicts with symbol, strategy, signal, entry, sl, tp, rr
+
+        Returns:
+            bool: False if the lease was lost to another worker
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "UPDATE shards SET status = 'done', lease_expires = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+                (shard_id, worker)
+            )
+            if cursor.rowcount != 1:
+                conn.execute("ROLLBACK")
+                return False
+            now = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO signals (tick, symbol, strategy, signal, entry, sl, tp, rr, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(tick, s["symbol"], s["strategy"], s["signal"], s["entry"], s["sl"], s["tp"], s["rr"], now) for s in signals]
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def claim_pending_signals(self, claim_seconds, min_age=0):
+        """
+        Claim pending signals for alerting, plus claims whose dispatcher died
+        before confirming them. Claimed rows are not handed out again until
+        the claim expires, so several dispatchers never alert the same signal.
+        Confirm each one with mark_signals_sent or hand it back with
+        release_signals.
+
+        Args:
+            claim_seconds: How long the claim holds before another dispatcher may retry
+            min_age: Claim nothing until the oldest claimable signal is this many
+                     seconds old, so signals arriving within that window go out together
+
+        Returns:
+            list: Dicts with tick, symbol, strategy, signal, entry, sl, tp, rr
+        """
+        now = time.time()
+        claimable = "status = 'pending' OR (status = 'claimed' AND claim_expires < ?)"
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            oldest = conn.execute(f"SELECT MIN(created_at) FROM signals WHERE {claimable}", (now,)).fetchone()[0]
+            if oldest is None or oldest > now - min_age:
+                conn.execute("COMMIT")
+                return []
+            rows = conn.execute(
+                f"SELECT tick, symbol, strategy, signal, entry, sl, tp, rr FROM signals WHERE {claimable} ORDER BY tick, symbol",
+                (now,)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE signals SET status = 'claimed', claim_expires = ? WHERE tick = ? AND symbol = ? AND strategy = ?",
+                [(now + claim_seconds, row[0], row[1], row[2]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        keys = ("tick", "symbol", "strategy", "signal", "entry", "sl", "tp", "rr")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def _update_claimed_signals(self, sql, signals):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                sql + " WHERE tick = ? AND symbol = ? AND strategy = ? AND status = 'claimed'",
+                [(s["tick"], s["symbol"], s["strategy"]) for s in signals]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def mark_signals_sent(self, signals):
+        """Confirm claimed signals whose alert was delivered"""
+        self._update_claimed_signals("UPDATE signals SET status = 'sent', claim_expires = NULL", signals)
+
+    def release_signals(self, signals):
+        """Return claimed signals whose alert failed to pending, counting the attempt"""
+        self._update_claimed_signals(
+            "UPDATE signals SET status = 'pending', claim_expires = NULL, attempts = attempts + 1", signals
+        )
+
+    def reap_undelivered_signals(self, max_age):
+        """
+        Retire signals that should no longer be sent: 'stale' once older than
+        max_age seconds, 'failed' once their alert failed max_attempts times.
+
+        Returns:
+            list: Dicts with tick, symbol, strategy, signal, status for each retired signal
+        """
+        now = time.time()
+        claimable = "(status = 'pending' OR (status = 'claimed' AND claim_expires < ?))"
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT tick, symbol, strategy, signal, "
+                "CASE WHEN created_at < ? THEN 'stale' ELSE 'failed' END FROM signals "
+                f"WHERE {claimable} AND (created_at < ? OR attempts >= ?)",
+                (now - max_age, now, now - max_age, self.max_attempts)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE signals SET status = ?, claim_expires = NULL WHERE tick = ? AND symbol = ? AND strategy = ?",
+                [(row[4], row[0], row[1], row[2]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        keys = ("tick", "symbol", "strategy", "signal", "status")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def reap_shards(self):
+        """
+        Retire shards that will not be scanned: 'expired' once past their
+        deadline, 'failed' once they used up their attempts.
+
+        Returns:
+            list: (shard_id, tick, symbols, last_worker, status) for each retired shard
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, tick, symbols, worker, CASE WHEN deadline < ? THEN 'expired' ELSE 'failed' END FROM shards "
+                "WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                "AND (deadline < ? OR attempts >= ?)",
+                (now, now, now, self.max_attempts)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE shards SET status = ?, lease_expires = NULL WHERE id = ?",
+                [(row[4], row[0]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return [(row[0], row[1], json.loads(row[2]), row[3], row[4]) for row in rows]